@@ -20,7 +20,8 @@ SCHEMA = {'execs_per_sec': float}
 
 def validate_fuzzer_stats(stats_json_str):
     """Validate that |stats_json_str| is a json representation of valid fuzzer
-    stats. Raises an exception if it is not, otherwise returns successfully."""
+    stats. Raises an exception if it is not, otherwise returns the parsed
+    stats."""
     stats = json.loads(stats_json_str)
 
     if not isinstance(stats, dict):
@@ -36,3 +37,5 @@ def validate_fuzzer_stats(stats_json_str):
         raise ValueError(
             f'Key "{key}" has value "{value}" which is type: "{type(value)}"' +
             f'. Expected type: "{expected_type}".')
+
+    return stats
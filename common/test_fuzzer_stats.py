@@ -19,8 +19,10 @@ from common import fuzzer_stats
 
 def test_validate_valid_fuzzer_stats():
     """Tests that validate_fuzzer_stats doesn't throw an exception for a valid
-    stats string."""
-    fuzzer_stats.validate_fuzzer_stats('{"execs_per_sec": 20.2}')
+    stats string and returns the parsed stats."""
+    assert fuzzer_stats.validate_fuzzer_stats('{"execs_per_sec": 20.2}') == {
+        'execs_per_sec': 20.2
+    }
 
 
 def test_validate_nondict_fuzzer_stats():
@@ -18,6 +18,8 @@ import os
 import urllib.request
 import urllib.error
 
+import xxhash
+
 ROOT_DIR = os.path.abspath(os.path.dirname(os.path.dirname(__file__)))
 
 assert not (os.getenv('FORCE_NOT_LOCAL') and os.getenv('FORCE_LOCAL')), (
@@ -58,6 +60,19 @@ def string_hash(obj):
     return hashlib.sha1(str(obj).encode('utf-8')).hexdigest()
 
 
+def content_hash(contents: bytes):
+    """Returns an xxh3 128-bit hash of |contents|. This is much faster than
+    SHA-1 and is used for naming files by their contents, not for security
+    purposes."""
+    return xxhash.xxh3_128_hexdigest(contents)
+
+
+def get_content_hasher():
+    """Returns an incremental hasher that produces the same digest as
+    content_hash() for the data passed to its update() method."""
+    return xxhash.xxh3_128()
+
+
 def file_hash(file_path):
     """Returns the SHA-1 hash of |file_path| contents."""
     chunk_size = 51200  # Read in 50 KB chunks.
@@ -16,6 +16,8 @@
 import os
 import json
 
+import orjson
+
 from common import experiment_path as exp_path
 from common import experiment_utils as exp_utils
 from common import new_process
@@ -225,8 +227,8 @@ def merge_profdata_files(src_files, dst_file):
 def get_coverage_infomation(coverage_summary_file):
     """Reads the coverage information from |coverage_summary_file|
     and skip possible warnings in the file."""
-    with open(coverage_summary_file) as summary:
-        return json.loads(summary.readlines()[-1])
+    with open(coverage_summary_file, 'rb') as summary:
+        return orjson.loads(summary.readlines()[-1])
 
 
 class TrialCoverage:  # pylint: disable=too-many-instance-attributes
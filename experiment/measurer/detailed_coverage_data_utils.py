@@ -15,22 +15,67 @@
 segment and function coverage for the entire experiment
 (all Fuzzer-benchmark-trial combinations)."""
 
+import concurrent.futures
+import gzip
+import io
 import os
 import hashlib
-
-import pandas as pd
+import sys
+import tempfile
 
 from common import experiment_path as exp_path
 from common import filestore_utils
 from experiment.measurer import coverage_utils
 
+# Level 1 gzip is several times faster than the default level 9 for a small
+# increase in file size. A fixed mtime keeps the output reproducible.
+CSV_COMPRESSION_LEVEL = 1
+CSV_MTIME = 1
+
+# Column types of the data frames. Names are stored as short ids that repeat
+# across many rows, so they are categorical.
+SEGMENT_DTYPES = {
+    'benchmark': 'category',
+    'fuzzer': 'category',
+    'trial': 'int32',
+    'time': 'int32',
+    'file': 'category',
+    'line': 'int32',
+    'column': 'int32',
+}
+FUNCTION_DTYPES = {
+    'benchmark': 'category',
+    'fuzzer': 'category',
+    'trial': 'int32',
+    'time': 'int32',
+    'function': 'category',
+    'hits': 'int64',
+}
+
+_pd = None
+
+
+def _get_pd():
+    """Returns the pandas module, importing it on first use. Only the final
+    data frames need pandas, so processes that only extract coverage don't pay
+    for importing it."""
+    global _pd  # pylint: disable=global-statement,invalid-name
+    if _pd is None:
+        import pandas  # pylint: disable=import-outside-toplevel
+        _pd = pandas
+    return _pd
+
 
 class DetailedCoverageData:  # pylint: disable=too-many-instance-attributes
     """Maintains segment and function coverage information, and writes this
     information to CSV files."""
 
-    def __init__(self):
-        """Constructor"""
+    def __init__(self, include_uncovered_functions=True):
+        """Constructor. Functions without hits are only recorded if
+        |include_uncovered_functions| is True. They are recorded by default, as
+        consumers of the CSV files use them to compute the total number of
+        functions."""
+        self.include_uncovered_functions = include_uncovered_functions
         self.segment_entries = []
         self.function_entries = []
         self.fuzzer_names = {}
@@ -38,42 +83,86 @@ class DetailedCoverageData:  # pylint: disable=too-many-instance-attributes
         self.function_names = {}
         self.file_names = {}
 
-        # Set by generate_data_frames_after_adding_all_entries().
+        # Index in segment_entries of each recorded segment, keyed by
+        # (trial, file, line, column). Trial ids are unique across benchmarks
+        # and fuzzers.
+        self.segment_indexes = {}
+
+        # Set by finalize().
         self.segment_df = None
         self.function_df = None
         self.name_df = None
 
-    def add_function_entry(  # pylint: disable=too-many-arguments
-            self, benchmark, fuzzer, trial_id, function, function_hits, time):
-        """Adds an entry to the function_df."""
-        fuzzer_id = self.name_to_id(fuzzer)
-        benchmark_id = self.name_to_id(benchmark)
-        function_id = self.name_to_id(function)
-        self.fuzzer_names[fuzzer] = fuzzer_id
-        self.benchmark_names[benchmark] = benchmark_id
-        self.function_names[function] = function_id
-
-        function_entry = [
-            benchmark_id, fuzzer_id, trial_id, time, function_id, function_hits
-        ]
-        self.function_entries.append(function_entry)
-
-    def add_segment_entry(  # pylint: disable=too-many-arguments
-            self, benchmark, fuzzer, trial_id, file_name, line, column, time):
-        """Adds an entry to the segment_df."""
-        fuzzer_id = self.name_to_id(fuzzer)
-        benchmark_id = self.name_to_id(benchmark)
-        file_id = self.name_to_id(file_name)
-        self.fuzzer_names[fuzzer] = fuzzer_id
-        self.benchmark_names[benchmark] = benchmark_id
-        self.file_names[file_name] = file_id
-
-        segment_entry = [
-            benchmark_id, fuzzer_id, trial_id, time, file_id, line, column
+    def add_function_entries(  # pylint: disable=too-many-arguments
+            self, benchmark, fuzzer, trial_id, functions_data, time):
+        """Adds an entry to function_entries for each function in
+        |functions_data|. Functions without hits are skipped unless
+        include_uncovered_functions is set."""
+        benchmark_id = self.add_name(benchmark, self.benchmark_names)
+        fuzzer_id = self.add_name(fuzzer, self.fuzzer_names)
+        self.function_entries.extend([
+            (benchmark_id, fuzzer_id, trial_id, time,
+             self.add_name(function_data['name'],
+                           self.function_names), function_data['count'])
+            for function_data in functions_data
+            if self.include_uncovered_functions or function_data['count'] != 0
+        ])
+
+    def add_segment_entries(  # pylint: disable=too-many-arguments
+            self, benchmark, fuzzer, trial_id, files_data, time):
+        """Adds an entry to segment_entries for each covered segment of each
+        file in |files_data|. The entries of all files are built by a single
+        comprehension so that segment_entries is only extended once."""
+        benchmark_id = self.add_name(benchmark, self.benchmark_names)
+        fuzzer_id = self.add_name(fuzzer, self.fuzzer_names)
+        # Segments are lists of [line, column, hits, ...].
+        covered_segments = [[
+            segment for segment in file_data['segments'] if segment[2] != 0
+        ] for file_data in files_data]
+        # Only name files that have covered segments.
+        covered_files = [
+            (self.add_name(file_data['filename'], self.file_names), segments)
+            for file_data, segments in zip(files_data, covered_segments)
+            if segments
         ]
-        self.segment_entries.append(segment_entry)
+        self.segment_entries.extend([(benchmark_id, fuzzer_id, trial_id, time,
+                                      file_id, segment[0], segment[1])
+                                     for file_id, segments in covered_files
+                                     for segment in segments])
+
+    def add_trial_specific_coverage_data(self, trial_specific_coverage_data):
+        """Adds the entries of |trial_specific_coverage_data| to this
+        experiment-wide container. Only the row lists are extended, data frames
+        are generated once by finalize(). Coverage only grows, so each cycle
+        re-reports the segments of earlier cycles. Those are dropped here, and
+        only the earliest time stamp of each segment is kept."""
+        segment_entries = self.segment_entries
+        segment_indexes = self.segment_indexes
+        for segment_entry in trial_specific_coverage_data.segment_entries:
+            _, _, trial_id, time, file_id, line, column = segment_entry
+            key = (trial_id, file_id, line, column)
+            index = segment_indexes.get(key)
+            if index is None:
+                segment_indexes[key] = len(segment_entries)
+                segment_entries.append(segment_entry)
+            elif time < segment_entries[index][3]:
+                # Snapshots of a trial aren't always merged in time order.
+                segment_entries[index] = segment_entry
+        # Ids are unpickled as new strings for every trial-specific container.
+        # Intern the function ids so that entries of the same function from
+        # different cycles share one string. Segment entries already share
+        # their ids per file.
+        for (benchmark_id, fuzzer_id, trial_id, time, function_id,
+             hits) in trial_specific_coverage_data.function_entries:
+            self.function_entries.append((benchmark_id, fuzzer_id, trial_id,
+                                          time, sys.intern(function_id), hits))
+        self.fuzzer_names.update(trial_specific_coverage_data.fuzzer_names)
+        self.benchmark_names.update(
+            trial_specific_coverage_data.benchmark_names)
+        self.function_names.update(trial_specific_coverage_data.function_names)
+        self.file_names.update(trial_specific_coverage_data.file_names)
 
-    def generate_data_frames_after_adding_all_entries(self):
+    def finalize(self):
         """Generates the data frames from the individual entries."""
 
         if len(self.segment_entries) == 0:
@@ -81,16 +170,13 @@ class DetailedCoverageData:  # pylint: disable=too-many-instance-attributes
                 'Finalizing, but no entries were added.')
             return
 
-        self.segment_df = pd.DataFrame(self.segment_entries,
-                                       columns=[
-                                           'benchmark', 'fuzzer', 'trial',
-                                           'time', 'file', 'line', 'column'
-                                       ])
-        self.function_df = pd.DataFrame(self.function_entries,
-                                        columns=[
-                                            'benchmark', 'fuzzer', 'trial',
-                                            'time', 'function', 'hits'
-                                        ])
+        pd = _get_pd()  # pylint: disable=invalid-name
+        self.segment_df = pd.DataFrame(
+            self.segment_entries,
+            columns=list(SEGMENT_DTYPES)).astype(SEGMENT_DTYPES)
+        self.function_df = pd.DataFrame(
+            self.function_entries,
+            columns=list(FUNCTION_DTYPES)).astype(FUNCTION_DTYPES)
 
         name_entries = []
         for name in self.benchmark_names:
@@ -104,23 +190,23 @@ class DetailedCoverageData:  # pylint: disable=too-many-instance-attributes
         self.name_df = pd.DataFrame(name_entries,
                                     columns=['id', 'name', 'type'])
 
+    def add_name(self, name, names):
+        """Records |name| in |names| and returns its id."""
+        name_id = sys.intern(self.name_to_id(name))
+        names[name] = name_id
+        return name_id
+
     def name_to_id(self, name):  # pylint: disable=no-self-use
         """Generates a hash for the name. This is to save disk storage"""
         return hashlib.md5(name.encode()).hexdigest()[:7]
 
     def remove_redundant_entries(self):
-        """Removes redundant entries in segment_df. Before calling this
-        method, for each time stamp, segment_df contains all segments that are
-        covered in this time stamp. After calling this method, for each time
-        stamp, segment_df only contains segments that have been covered since
-        the previous time stamp. This significantly reduces the size of the
-        resulting CSV file."""
+        """Removes redundant entries in name_df. Segments that were already
+        covered at an earlier time stamp are dropped when trial-specific data is
+        merged by add_trial_specific_coverage_data(), so segment_df only
+        contains segments that have been covered since the previous time
+        stamp."""
         try:
-            # Drop duplicates but with different timestamps in segment data.
-            self.segment_df = self.segment_df.sort_values(by=['time'])
-            self.segment_df = self.segment_df.drop_duplicates(
-                subset=self.segment_df.columns.difference(['time']),
-                keep='first')
             self.name_df = self.name_df.drop_duplicates(keep='first')
 
         except (ValueError, KeyError, IndexError):
@@ -133,56 +219,78 @@ class DetailedCoverageData:  # pylint: disable=too-many-instance-attributes
         all strings, such as file and function names, are referenced by id and
         resolved in 'names.csv'."""
 
+        self.finalize()
+        if self.segment_df is None:
+            return
+
         # Clean and prune experiment-specific data frames.
         self.remove_redundant_entries()
 
-        # Write CSV files to filestore.
-        def csv_filestore_helper(file_name, df):
-            """Helper method for storing csv files in filestore."""
-            src = os.path.join(coverage_utils.get_coverage_info_dir(), 'data',
-                               file_name)
-            dst = exp_path.filestore(src)
-            df.to_csv(src, index=False, compression='infer')
-            filestore_utils.cp(src, dst)
+        data_dir = os.path.join(coverage_utils.get_coverage_info_dir(), 'data')
+        csv_files = [('functions.csv.gz', self.function_df),
+                     ('segments.csv.gz', self.segment_df),
+                     ('names.csv.gz', self.name_df)]
+        with tempfile.TemporaryDirectory() as csv_dir:
+            # Write the files concurrently, zlib releases the GIL while
+            # compressing.
+            with concurrent.futures.ThreadPoolExecutor() as executor:
+                futures = [
+                    executor.submit(write_compressed_csv, df,
+                                    os.path.join(csv_dir, file_name))
+                    for file_name, df in csv_files
+                ]
+                for future in futures:
+                    future.result()
+
+            # Copy all files to the filestore with a single command.
+            filestore_utils.rsync(csv_dir,
+                                  exp_path.filestore(data_dir),
+                                  delete=False,
+                                  parallel=True)
+
 
-        csv_filestore_helper('functions.csv.gz', self.function_df)
-        csv_filestore_helper('segments.csv.gz', self.segment_df)
-        csv_filestore_helper('names.csv.gz', self.name_df)
+def write_compressed_csv(data_frame, path):
+    """Writes |data_frame| to |path| as a gzip compressed CSV file. The gzip
+    file is opened here rather than by pandas, as the pinned pandas version
+    ignores compression options for gzip."""
+    with gzip.GzipFile(path,
+                       'wb',
+                       compresslevel=CSV_COMPRESSION_LEVEL,
+                       mtime=CSV_MTIME) as gzip_file:
+        with io.TextIOWrapper(gzip_file, encoding='utf-8',
+                              newline='') as csv_file:
+            data_frame.to_csv(csv_file, index=False)
 
 
-def extract_segments_and_functions_from_summary_json(  # pylint: disable=too-many-locals
-        summary_json_file, benchmark, fuzzer, trial_id, time):
+def extract_segments_and_functions_from_summary_json(  # pylint: disable=too-many-locals,too-many-arguments
+        summary_json_file,
+        benchmark,
+        fuzzer,
+        trial_id,
+        time,
+        include_uncovered_functions=True):
     """Return a trial-specific data frame container with segment and function
      coverage information given a trial-specific coverage summary json file."""
 
-    trial_specific_coverage_data = DetailedCoverageData()
+    trial_specific_coverage_data = DetailedCoverageData(
+        include_uncovered_functions=include_uncovered_functions)
 
     try:
         coverage_info = coverage_utils.get_coverage_infomation(
             summary_json_file)
         # Extract coverage information for functions.
-        for function_data in coverage_info['data'][0]['functions']:
-            trial_specific_coverage_data.add_function_entry(
-                benchmark, fuzzer, trial_id, function_data['name'],
-                function_data['count'], time)
+        trial_specific_coverage_data.add_function_entries(
+            benchmark, fuzzer, trial_id, coverage_info['data'][0]['functions'],
+            time)
 
         # Extract coverage information for segments.
-        for file in coverage_info['data'][0]['files']:
-            for segment in file['segments']:
-                if segment[2] != 0:  # Segment hits.
-                    trial_specific_coverage_data.add_segment_entry(
-                        benchmark,
-                        fuzzer,
-                        trial_id,
-                        file['filename'],
-                        segment[0],  # Segment line.
-                        segment[1],  # Segment column.
-                        time)
+        trial_specific_coverage_data.add_segment_entries(
+            benchmark, fuzzer, trial_id, coverage_info['data'][0]['files'],
+            time)
 
     except (ValueError, KeyError, IndexError):
         coverage_utils.logger.error(
             'Failed when extracting trial-specific segment and function '
             'information from coverage summary.')
 
-    trial_specific_coverage_data.generate_data_frames_after_adding_all_entries()
     return trial_specific_coverage_data
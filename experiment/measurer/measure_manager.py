@@ -28,8 +28,6 @@ import time
 from typing import List, Set
 import queue
 
-import pandas as pd
-
 from sqlalchemy import func
 from sqlalchemy import orm
 
@@ -60,6 +58,7 @@ RETRY_DELAY = 3
 FAIL_WAIT_SECONDS = 30
 SNAPSHOT_QUEUE_GET_TIMEOUT = 1
 SNAPSHOTS_BATCH_SAVE_SIZE = 100
+CORPUS_UNIT_CHUNK_SIZE = 1024 * 1024
 
 
 def exists_in_experiment_filestore(path: pathlib.Path) -> bool:
@@ -144,9 +143,9 @@ def measure_all_trials(  # pylint: disable=too-many-arguments,too-many-locals
         return False
 
     # Multiprocessing list to store all trial-specific detailed_coverage_data.
-    trail_specific_coverage_data_list = (
-        manager.list(  # pytype:disable=attribute-error
-            [detailed_coverage_data]))
+    # pytype: disable=attribute-error
+    trail_specific_coverage_data_list = manager.list()
+    # pytype: enable=attribute-error
 
     measure_trial_coverage_args = [
         (unmeasured_snapshot, max_cycle, q, trail_specific_coverage_data_list)
@@ -198,17 +197,13 @@ def measure_all_trials(  # pylint: disable=too-many-arguments,too-many-locals
     # If we have any snapshots left save them now.
     save_snapshots()
 
-    # Concatenate all trial-specific data frames and remove duplicates.
-    detailed_coverage_data.segment_df = pd.concat(
-        [df.segment_df for df in trail_specific_coverage_data_list],
-        ignore_index=True)
-    detailed_coverage_data.function_df = pd.concat(
-        [df.function_df for df in trail_specific_coverage_data_list],
-        ignore_index=True)
-    detailed_coverage_data.name_df = pd.concat(
-        [df.name_df for df in trail_specific_coverage_data_list],
-        ignore_index=True)
-    detailed_coverage_data.remove_redundant_duplicates()
+    # Merge the entries of all trial-specific coverage data. Data frames are
+    # only generated once, when the CSV files are written. Slice the list
+    # proxy so that it is fetched from the manager in a single call instead of
+    # one call per item.
+    for trial_specific_coverage_data in trail_specific_coverage_data_list[:]:
+        detailed_coverage_data.add_trial_specific_coverage_data(
+            trial_specific_coverage_data)
 
     logger.info('Done measuring all trials.')
     return snapshots_measured
@@ -318,34 +313,78 @@ def get_unmeasured_snapshots(experiment: str,
     return unmeasured_first_snapshots + unmeasured_latest_snapshots
 
 
-def extract_corpus(corpus_archive: str, sha_blacklist: Set[str],
-                   output_directory: str):
-    """Extract a corpus from |corpus_archive| to |output_directory|."""
-    pathlib.Path(output_directory).mkdir(exist_ok=True)
-    tar = tarfile.open(corpus_archive, 'r:gz')
-    for member in tar.getmembers():
-
-        if not member.isfile():
-            # We don't care about directory structure. So skip if not a file.
-            continue
-
-        member_file_handle = tar.extractfile(member)
-        if not member_file_handle:
-            logger.info('Failed to get handle to %s', member)
-            continue
+def _write_corpus_unit(unit_contents: bytes, unit_blacklist: Set[str],
+                       output_directory: str):
+    """Writes |unit_contents| to a file in |output_directory| named after its
+    hash, unless the hash is in |unit_blacklist|."""
+    filename = utils.content_hash(unit_contents)
+    if filename in unit_blacklist:
+        return
 
-        member_contents = member_file_handle.read()
-        filename = utils.string_hash(member_contents)
-        if filename in sha_blacklist:
-            continue
+    file_path = os.path.join(output_directory, filename)
+    try:
+        filesystem.write(file_path, unit_contents, 'xb')
+    except FileExistsError:
+        # Don't write out duplicates in the archive.
+        pass
+
+
+def _stream_corpus_unit(member_file_handle, unit_blacklist: Set[str],
+                        output_directory: str):
+    """Copies the unit in |member_file_handle| to a file in |output_directory|
+    named after its hash, unless the hash is in |unit_blacklist|. The unit is
+    hashed while it is copied, in chunks, so it is never fully kept in
+    memory."""
+    hasher = utils.get_content_hasher()
+    temp_path = os.path.join(output_directory, '.unit.tmp')
+    try:
+        with open(temp_path, 'wb') as temp_file:
+            chunk = member_file_handle.read(CORPUS_UNIT_CHUNK_SIZE)
+            while chunk:
+                hasher.update(chunk)
+                temp_file.write(chunk)
+                chunk = member_file_handle.read(CORPUS_UNIT_CHUNK_SIZE)
+
+        filename = hasher.hexdigest()
+        if filename in unit_blacklist:
+            return
 
         file_path = os.path.join(output_directory, filename)
-
         if os.path.exists(file_path):
             # Don't write out duplicates in the archive.
-            continue
+            return
+        os.replace(temp_path, file_path)
+    finally:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
 
-        filesystem.write(file_path, member_contents, 'wb')
+
+def extract_corpus(corpus_archive: str, unit_blacklist: Set[str],
+                   output_directory: str):
+    """Extract a corpus from |corpus_archive| to |output_directory|."""
+    pathlib.Path(output_directory).mkdir(exist_ok=True)
+    # Open the archive in stream mode so that it is only decompressed once.
+    with tarfile.open(corpus_archive, 'r|gz') as tar:
+        for member in tar:
+            if not member.isfile():
+                # We don't care about directory structure. So skip if not a
+                # file.
+                continue
+
+            member_file_handle = tar.extractfile(member)
+            if not member_file_handle:
+                logger.info('Failed to get handle to %s', member)
+                continue
+
+            if member.size > CORPUS_UNIT_CHUNK_SIZE:
+                # Stream large units to disk instead of reading them into
+                # memory. This has to be done before moving to the next member.
+                _stream_corpus_unit(member_file_handle, unit_blacklist,
+                                    output_directory)
+                continue
+
+            _write_corpus_unit(member_file_handle.read(), unit_blacklist,
+                               output_directory)
 
 
 class SnapshotMeasurer(coverage_utils.TrialCoverage):  # pylint: disable=too-many-instance-attributes
@@ -368,6 +407,8 @@ class SnapshotMeasurer(coverage_utils.TrialCoverage):  # pylint: disable=too-man
         # Stores the files that have already been measured for a trial.
         self.measured_files_path = os.path.join(self.report_dir,
                                                 'measured-files.txt')
+        # Cached contents of measured_files_path, set by get_measured_files().
+        self.measured_files = None
 
         # Used by the runner to signal that there won't be a corpus archive for
         # a cycle because the corpus hasn't changed since the last cycle.
@@ -582,18 +623,27 @@ class SnapshotMeasurer(coverage_utils.TrialCoverage):  # pylint: disable=too-man
 
     def update_measured_files(self):
         """Updates the measured-files.txt file for this trial with
-        files measured in this snapshot."""
+        files measured in this snapshot. The file only grows, so just the
+        newly measured files are appended to it."""
         current_files = set(os.listdir(self.corpus_dir))
         already_measured = self.get_measured_files()
-        filesystem.write(self.measured_files_path,
-                         '\n'.join(current_files.union(already_measured)))
+        new_files = current_files - already_measured
+        if not new_files:
+            return
+        already_measured.update(new_files)
+        filesystem.append(self.measured_files_path, '\n'.join(new_files))
 
     def get_measured_files(self):
         """Returns a the set of files that have been measured for this
-        snapshot's trials."""
-        if not os.path.exists(self.measured_files_path):
-            return set()
-        return set(filesystem.read(self.measured_files_path).splitlines())
+        snapshot's trials. The file is only read the first time this is
+        called."""
+        if self.measured_files is None:
+            if os.path.exists(self.measured_files_path):
+                self.measured_files = set(
+                    filesystem.read(self.measured_files_path).splitlines())
+            else:
+                self.measured_files = set()
+        return self.measured_files
 
     def get_fuzzer_stats(self, cycle):
         """Get the fuzzer stats for |cycle|."""
@@ -616,8 +666,7 @@ def get_fuzzer_stats(stats_filestore_path):
         if result.retcode != 0:
             return None
         stats_str = temp_file.read()
-    fuzzer_stats.validate_fuzzer_stats(stats_str)
-    return json.loads(stats_str)
+    return fuzzer_stats.validate_fuzzer_stats(stats_str)
 
 
 def measure_trial_coverage(  # pylint: disable=invalid-name,too-many-arguments
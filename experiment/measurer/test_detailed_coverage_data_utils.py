@@ -12,7 +12,12 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 """Tests for detailed_coverage_data_utils.py"""
+import gzip
 import os
+from unittest import mock
+
+import pandas as pd
+import pytest
 
 from experiment.measurer import detailed_coverage_data_utils
 
@@ -46,6 +51,7 @@ def test_data_frame_container_remove_redundant_entries(fs):
         detailed_coverage_data_utils.
         extract_segments_and_functions_from_summary_json(
             summary_json_file, BENCHMARK, FUZZER, TRIAL_ID, TIMESTAMP))
+    trial_specific_coverage_data.finalize()
 
     # Check whether the length of the segment data frame is the same if we
     # request pandas to drop all duplicates with the same time stamp
@@ -68,6 +74,7 @@ def test_extract_segments_and_functions_from_summary_json_for_segments(fs):
         detailed_coverage_data_utils.
         extract_segments_and_functions_from_summary_json(
             summary_json_file, BENCHMARK, FUZZER, TRIAL_ID, TIMESTAMP))
+    trial_specific_coverage_data.finalize()
 
     fuzzer_ids = trial_specific_coverage_data.segment_df['fuzzer'].unique()
     benchmark_ids = trial_specific_coverage_data.function_df[
@@ -106,6 +113,7 @@ def test_extract_segments_and_functions_from_summary_json_for_functions(fs):
         detailed_coverage_data_utils.
         extract_segments_and_functions_from_summary_json(
             summary_json_file, BENCHMARK, FUZZER, TRIAL_ID, TIMESTAMP))
+    trial_specific_coverage_data.finalize()
 
     fuzzer_ids = trial_specific_coverage_data.function_df['fuzzer'].unique()
     benchmark_ids = trial_specific_coverage_data.function_df[
@@ -132,6 +140,166 @@ def test_extract_segments_and_functions_from_summary_json_for_functions(fs):
                                'function', FUNCTION_NAMES)
 
 
+def test_add_trial_specific_coverage_data(fs):
+    """Tests that add_trial_specific_coverage_data merges the entries and names
+    of trial-specific coverage data into the experiment-wide container."""
+
+    summary_json_file = get_test_data_path(SUMMARY_JSON_FILE)
+    fs.add_real_file(summary_json_file, read_only=False)
+
+    detailed_coverage_data = detailed_coverage_data_utils.DetailedCoverageData()
+    for trial_id in [TRIAL_ID, TRIAL_ID + 1]:
+        detailed_coverage_data.add_trial_specific_coverage_data(
+            detailed_coverage_data_utils.
+            extract_segments_and_functions_from_summary_json(
+                summary_json_file, BENCHMARK, FUZZER, trial_id, TIMESTAMP))
+    detailed_coverage_data.finalize()
+
+    assert len(detailed_coverage_data.segment_df
+              ) == 2 * NUM_COVERED_SEGMENTS_IN_COV_SUMMARY
+    assert len(
+        detailed_coverage_data.function_df) == 2 * NUM_FUNCTION_IN_COV_SUMMARY
+    assert set(detailed_coverage_data.segment_df['trial'].unique()) == {
+        TRIAL_ID, TRIAL_ID + 1
+    }
+    assert detailed_coverage_data.segment_df.dtypes.to_dict() == (
+        detailed_coverage_data_utils.SEGMENT_DTYPES)
+    assert detailed_coverage_data.function_df.dtypes.to_dict() == (
+        detailed_coverage_data_utils.FUNCTION_DTYPES)
+
+
+def test_add_trial_specific_coverage_data_skips_seen_segments(fs):
+    """Tests that merging only keeps the earliest time stamp of a segment, even
+    when the later snapshot is merged first."""
+
+    summary_json_file = get_test_data_path(SUMMARY_JSON_FILE)
+    fs.add_real_file(summary_json_file, read_only=False)
+
+    detailed_coverage_data = detailed_coverage_data_utils.DetailedCoverageData()
+    for time_stamp in [2 * TIMESTAMP, TIMESTAMP, 3 * TIMESTAMP]:
+        detailed_coverage_data.add_trial_specific_coverage_data(
+            detailed_coverage_data_utils.
+            extract_segments_and_functions_from_summary_json(
+                summary_json_file, BENCHMARK, FUZZER, TRIAL_ID, time_stamp))
+    detailed_coverage_data.finalize()
+
+    assert len(detailed_coverage_data.segment_df
+              ) == NUM_COVERED_SEGMENTS_IN_COV_SUMMARY
+    assert set(
+        detailed_coverage_data.segment_df['time'].unique()) == {TIMESTAMP}
+
+
+@pytest.mark.parametrize('include_uncovered_functions,expected_functions',
+                         [(False, {'covered'}),
+                          (True, {'covered', 'uncovered'})])
+def test_add_function_entries_uncovered_functions(include_uncovered_functions,
+                                                  expected_functions):
+    """Tests that add_function_entries only records functions without hits when
+    include_uncovered_functions is set."""
+    detailed_coverage_data = detailed_coverage_data_utils.DetailedCoverageData(
+        include_uncovered_functions=include_uncovered_functions)
+    functions_data = [{
+        'name': 'covered',
+        'count': 2
+    }, {
+        'name': 'uncovered',
+        'count': 0
+    }]
+    detailed_coverage_data.add_function_entries(BENCHMARK, FUZZER, TRIAL_ID,
+                                                functions_data, TIMESTAMP)
+    recorded_ids = {
+        entry[4] for entry in detailed_coverage_data.function_entries
+    }
+    assert recorded_ids == {
+        detailed_coverage_data.function_names[name]
+        for name in expected_functions
+    }
+    assert set(detailed_coverage_data.function_names) == expected_functions
+
+
+def test_uncovered_functions_included_by_default():
+    """Tests that functions without hits are recorded by default."""
+    detailed_coverage_data = detailed_coverage_data_utils.DetailedCoverageData()
+    functions_data = [{'name': 'uncovered', 'count': 0}]
+    detailed_coverage_data.add_function_entries(BENCHMARK, FUZZER, TRIAL_ID,
+                                                functions_data, TIMESTAMP)
+    assert set(detailed_coverage_data.function_names) == {'uncovered'}
+
+
+def test_add_segment_entries_names_covered_files_only():
+    """Tests that add_segment_entries only records segments with hits, and
+    only names files with such segments."""
+    detailed_coverage_data = detailed_coverage_data_utils.DetailedCoverageData()
+    files_data = [{
+        'filename': 'covered',
+        'segments': [[1, 2, 0, True, True, False], [3, 4, 5, True, True, False]]
+    }, {
+        'filename': 'uncovered',
+        'segments': [[6, 7, 0, True, True, False]]
+    }, {
+        'filename': 'empty',
+        'segments': []
+    }]
+    detailed_coverage_data.add_segment_entries(BENCHMARK, FUZZER, TRIAL_ID,
+                                               files_data, TIMESTAMP)
+    file_id = detailed_coverage_data.file_names['covered']
+    assert detailed_coverage_data.segment_entries == [
+        (detailed_coverage_data.benchmark_names[BENCHMARK],
+         detailed_coverage_data.fuzzer_names[FUZZER], TRIAL_ID, TIMESTAMP,
+         file_id, 3, 4)
+    ]
+    assert set(detailed_coverage_data.file_names) == {'covered'}
+
+
+@mock.patch('common.filestore_utils.rsync')
+def test_generate_csv_files(mocked_rsync, fs, experiment):
+    """Tests that generate_csv_files writes the compressed CSV files and copies
+    them to the filestore with a single command."""
+
+    summary_json_file = get_test_data_path(SUMMARY_JSON_FILE)
+    fs.add_real_file(summary_json_file, read_only=False)
+
+    detailed_coverage_data = detailed_coverage_data_utils.DetailedCoverageData()
+    detailed_coverage_data.add_trial_specific_coverage_data(
+        detailed_coverage_data_utils.
+        extract_segments_and_functions_from_summary_json(
+            summary_json_file, BENCHMARK, FUZZER, TRIAL_ID, TIMESTAMP))
+
+    copied_files = []
+
+    def mock_rsync(source, *args, **kwargs):  # pylint: disable=unused-argument
+        copied_files.extend(os.listdir(source))
+
+    mocked_rsync.side_effect = mock_rsync
+    detailed_coverage_data.generate_csv_files()
+
+    mocked_rsync.assert_called_once_with(
+        mock.ANY,
+        'gs://experiment-data/test-experiment/coverage/data',
+        delete=False,
+        parallel=True)
+    assert sorted(copied_files) == [
+        'functions.csv.gz', 'names.csv.gz', 'segments.csv.gz'
+    ]
+
+
+def test_write_compressed_csv(tmp_path):
+    """Tests that write_compressed_csv writes a level 1 gzip file with a fixed
+    mtime."""
+    path = str(tmp_path / 'names.csv.gz')
+    detailed_coverage_data_utils.write_compressed_csv(
+        pd.DataFrame([['id', 'name', 'type']], columns=['a', 'b', 'c']), path)
+
+    with open(path, 'rb') as file_handle:
+        header = file_handle.read(10)
+    # Bytes 4 to 7 of the header are the mtime. Byte 8 is 4 for the fastest
+    # compression level.
+    assert header[4:8] == b'\x01\x00\x00\x00'
+    assert header[8] == 4
+    with gzip.open(path, 'rt') as file_handle:
+        assert file_handle.read() == 'a,b,c\nid,name,type\n'
+
+
 def integrity_check_helper(trial_specific_coverage_data, _id, _type, name):
     """Helper function to check the integrity of resulting
     trial_specific_coverage_data after
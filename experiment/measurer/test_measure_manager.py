@@ -15,6 +15,7 @@
 
 import os
 import shutil
+import tarfile
 from unittest import mock
 import queue
 
@@ -22,6 +23,7 @@ import pytest
 
 from common import experiment_utils
 from common import new_process
+from common import utils
 from database import models
 from database import utils as db_utils
 from experiment.build import build_utils
@@ -299,6 +301,25 @@ def test_is_cycle_unchanged_no_file(mocked_cp, fs, experiment):
     assert not snapshot_measurer.is_cycle_unchanged(0)
 
 
+@mock.patch('common.filesystem.read')
+def test_update_measured_files(mocked_read, fs, experiment):
+    """Tests that update_measured_files records the corpus units and only reads
+    measured-files.txt once."""
+    snapshot_measurer = measure_manager.SnapshotMeasurer(
+        FUZZER, BENCHMARK, TRIAL_NUM, SNAPSHOT_LOGGER)
+    snapshot_measurer.initialize_measurement_dirs()
+    fs.create_file(snapshot_measurer.measured_files_path, contents='old\n')
+    mocked_read.return_value = 'old\n'
+    fs.create_file(os.path.join(snapshot_measurer.corpus_dir, 'new'))
+
+    assert snapshot_measurer.get_measured_files() == {'old'}
+    snapshot_measurer.update_measured_files()
+    assert snapshot_measurer.get_measured_files() == {'old', 'new'}
+    assert mocked_read.call_count == 1
+    with open(snapshot_measurer.measured_files_path) as file_handle:
+        assert file_handle.read() == 'old\nnew\n'
+
+
 @mock.patch('common.new_process.execute')
 @mock.patch('common.benchmark_utils.get_fuzz_target',
             return_value='fuzz-target')
@@ -445,13 +466,42 @@ def test_extract_corpus(archive_name, tmp_path):
     archive_path = get_test_data_path(archive_name)
     measure_manager.extract_corpus(archive_path, set(), tmp_path)
     expected_corpus_files = {
-        '5ea57dfc9631f35beecb5016c4f1366eb6faa810',
-        '2f1507c3229c5a1f8b619a542a8e03ccdbb3c29c',
-        'b6ccc20641188445fa30c8485a826a69ac4c6b60'
+        '5c73e7e3dcbb0395e841f27363849a18', '8028a127a9a16da01fe9603eafb243f7',
+        'ccd433e50931cf855b19ef905838a84a'
     }
     assert expected_corpus_files.issubset(set(os.listdir(tmp_path)))
 
 
+def test_extract_corpus_blacklist(tmp_path):
+    """Tests that extract_corpus skips units in the blacklist."""
+    archive_path = get_test_data_path('libfuzzer-corpus.tgz')
+    blacklisted_unit = '5c73e7e3dcbb0395e841f27363849a18'
+    measure_manager.extract_corpus(archive_path, {blacklisted_unit}, tmp_path)
+    corpus_files = set(os.listdir(tmp_path))
+    assert blacklisted_unit not in corpus_files
+    assert {
+        '8028a127a9a16da01fe9603eafb243f7', 'ccd433e50931cf855b19ef905838a84a'
+    }.issubset(corpus_files)
+
+
+def test_extract_corpus_large_unit(tmp_path):
+    """Tests that extract_corpus streams units that are larger than
+    CORPUS_UNIT_CHUNK_SIZE to disk under the same name as other units."""
+    unit_contents = b'A' * (measure_manager.CORPUS_UNIT_CHUNK_SIZE * 2 + 1)
+    unit_path = tmp_path / 'unit'
+    unit_path.write_bytes(unit_contents)
+    archive_path = tmp_path / 'corpus.tgz'
+    with tarfile.open(archive_path, 'w:gz') as tar:
+        tar.add(unit_path, arcname='corpus/unit')
+
+    output_directory = tmp_path / 'corpus'
+    measure_manager.extract_corpus(str(archive_path), set(),
+                                   str(output_directory))
+    filename = utils.content_hash(unit_contents)
+    assert os.listdir(output_directory) == [filename]
+    assert (output_directory / filename).read_bytes() == unit_contents
+
+
 @mock.patch('time.sleep', return_value=None)
 @mock.patch('experiment.measurer.measure_manager.set_up_coverage_binaries')
 @mock.patch('experiment.measurer.measure_manager.measure_all_trials',